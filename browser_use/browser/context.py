@@ -1011,22 +1011,29 @@ class BrowserContext:
 		"""
 		Returns a base64 encoded screenshot of the current page.
 		"""
+		screenshot = await self.take_screenshot_raw(full_page=full_page)
+
+		screenshot_b64 = base64.b64encode(screenshot).decode('utf-8')
+
+		# await self.remove_highlights()
+
+		return screenshot_b64
+
+	@time_execution_async('--take_screenshot_raw')
+	async def take_screenshot_raw(self, full_page: bool = False) -> bytes:
+		"""
+		Returns the raw PNG bytes of a screenshot of the current page.
+		"""
 		page = await self.get_current_page()
 
 		await page.bring_to_front()
 		await page.wait_for_load_state()
 
-		screenshot = await page.screenshot(
+		return await page.screenshot(
 			full_page=full_page,
 			animations='disabled',
 		)
 
-		screenshot_b64 = base64.b64encode(screenshot).decode('utf-8')
-
-		# await self.remove_highlights()
-
-		return screenshot_b64
-
 	@time_execution_async('--remove_highlights')
 	async def remove_highlights(self):
 		"""
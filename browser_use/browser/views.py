@@ -36,6 +36,8 @@ class BrowserState(DOMState):
 	pixels_above: int = 0
 	pixels_below: int = 0
 	browser_errors: list[str] = field(default_factory=list)
+	# Raw PNG bytes, only set by callers that need to avoid the base64 round-trip
+	screenshot_raw: Optional[bytes] = None
 
 
 @dataclass
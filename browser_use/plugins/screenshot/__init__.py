@@ -1,9 +1,10 @@
 from .service import ScreenshotPlugin
-from .integration import setup_agent_with_screenshot_plugin, create_screenshot_callbacks, wrap_multi_act
+from .integration import setup_agent_with_screenshot_plugin, create_screenshot_callbacks, wrap_multi_act, wrap_run
 
 __all__ = [
     'ScreenshotPlugin',
     'setup_agent_with_screenshot_plugin',
     'create_screenshot_callbacks',
     'wrap_multi_act',
+    'wrap_run',
 ] 
\ No newline at end of file
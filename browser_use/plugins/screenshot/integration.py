@@ -1,6 +1,7 @@
+import dataclasses
 import logging
 from functools import wraps
-from typing import Callable, List, Tuple, Dict, Any, Union, Awaitable, Optional
+from typing import Callable, List, Tuple, Any, Union, Awaitable
 import asyncio
 
 from browser_use.agent.service import Agent
@@ -31,16 +32,7 @@ def create_screenshot_callbacks(plugin: ScreenshotPlugin) -> Tuple[
     Returns:
         Tuple of (step_callback, done_callback) functions
     """
-    
-    async def step_callback(state: BrowserState, model_output: Any, step_number: int) -> None:
-        """Callback for each step"""
-        plugin.handle_step(state, model_output, step_number)
-    
-    async def done_callback(history: AgentHistoryList) -> None:
-        """Callback when agent is done"""
-        plugin.handle_done(history.model_dump().get("history", []))
-    
-    return step_callback, done_callback
+    return plugin.astep, plugin.adone
 
 def wrap_multi_act(original_multi_act: Callable, plugin: ScreenshotPlugin) -> Callable:
     """
@@ -63,11 +55,16 @@ def wrap_multi_act(original_multi_act: Callable, plugin: ScreenshotPlugin) -> Ca
         if browser_context and isinstance(browser_context, BrowserContext):
             try:
                 # Save initial screenshot for the step
+                # The raw bytes go on a copy: get_state may return the context's cached state,
+                # which the agent (and an already queued step write) still reference
                 state = await browser_context.get_state(cache_clickable_elements_hashes=True)
-                screenshot_path = await browser_context.take_screenshot(full_page=plugin.full_page)
-                if screenshot_path:
-                    state.screenshot = screenshot_path
-                plugin.save_screenshot(state, 0, plugin.current_step)
+                screenshot_raw = await browser_context.take_screenshot_raw(full_page=plugin.full_page)
+                plugin.queue_write(
+                    plugin.save_screenshot,
+                    dataclasses.replace(state, screenshot_raw=screenshot_raw),
+                    0,
+                    plugin.current_step,
+                )
             except Exception as e:
                 logger.error(f"Error capturing initial screenshot: {e}")
         
@@ -77,18 +74,20 @@ def wrap_multi_act(original_multi_act: Callable, plugin: ScreenshotPlugin) -> Ca
         # Get the current browser state after execution
         if browser_context and isinstance(browser_context, BrowserContext):
             try:
-                # Get state and save screenshot for each result
-                for i, result in enumerate(results):
-                    # Get the latest browser state after each action
-                    state = await browser_context.get_state(cache_clickable_elements_hashes=True)
-                    screenshot_path = await browser_context.take_screenshot(full_page=plugin.full_page)
-                    if screenshot_path:
-                        state.screenshot = screenshot_path
-                    plugin.save_screenshot(state, i + 1, plugin.current_step)
+                # The page is only observable after all actions have run, so every
+                # per-result capture would see the same DOM: take a single final one
+                state = await browser_context.get_state(cache_clickable_elements_hashes=True)
+                screenshot_raw = await browser_context.take_screenshot_raw(full_page=plugin.full_page)
                 
-                # Save all results
-                plugin.save_results(results)
-                logger.info(f"Saved results and screenshots for step {plugin.current_step}")
+                # Save the final screenshot and all results in the background
+                plugin.queue_write(
+                    plugin.save_screenshot,
+                    dataclasses.replace(state, screenshot_raw=screenshot_raw),
+                    len(results),
+                    plugin.current_step,
+                )
+                plugin.queue_write(plugin.save_results, results, plugin.current_step)
+                logger.info(f"Queued results and screenshots for step {plugin.current_step}")
             except Exception as e:
                 logger.error(f"Error capturing screenshots and saving results: {e}")
         
@@ -99,11 +98,36 @@ def wrap_multi_act(original_multi_act: Callable, plugin: ScreenshotPlugin) -> Ca
     
     return wrapped_multi_act
 
+def wrap_run(original_run: Callable, plugin: ScreenshotPlugin) -> Callable:
+    """
+    Wrap the agent's run method so queued plugin writes are flushed however the run ends.
+    
+    The done callback only fires when the task completes, not when the run stops on
+    max_steps, max_failures, a stop request or an exception.
+    
+    Args:
+        original_run: Original run method of the agent
+        plugin: ScreenshotPlugin instance
+        
+    Returns:
+        Wrapped run function
+    """
+    @wraps(original_run)
+    async def wrapped_run(*args, **kwargs):
+        try:
+            return await original_run(*args, **kwargs)
+        finally:
+            await plugin.flush()
+    
+    return wrapped_run
+
 def setup_agent_with_screenshot_plugin(
     agent: Agent, 
     screenshot_dir: str = "screenshots",
     save_plans: bool = True,
-    full_page: bool = True
+    full_page: bool = True,
+    image_format: str = "png",
+    archive: bool = False,
 ) -> ScreenshotPlugin:
     """
     Set up an agent with the screenshot plugin.
@@ -112,28 +136,39 @@ def setup_agent_with_screenshot_plugin(
     1. Creating the plugin instance
     2. Setting up callback functions
     3. Wrapping the multi_act method
+    4. Wrapping the run method to flush queued writes on every exit path
     
     Args:
         agent: Agent instance to configure
         screenshot_dir: Directory to save screenshots
         save_plans: Whether to save plan information
         full_page: Whether to capture the full scrollable page
+        image_format: Screenshot file format, "png" or "webp" (requires Pillow)
+        archive: Whether to write all per-step files into a single tar file per session
         
     Returns:
         Configured ScreenshotPlugin instance
     """
     # Create the plugin instance
-    plugin = ScreenshotPlugin(base_dir=screenshot_dir, save_plans=save_plans, full_page=full_page)
+    plugin = ScreenshotPlugin(
+        base_dir=screenshot_dir,
+        save_plans=save_plans,
+        full_page=full_page,
+        image_format=image_format,
+        archive=archive,
+    )
     
     # Set up callbacks
-    step_callback, done_callback = create_screenshot_callbacks(plugin)
-    agent.register_new_step_callback = step_callback
-    agent.register_done_callback = done_callback
+    agent.register_new_step_callback = plugin.astep
+    agent.register_done_callback = plugin.adone
     
     # Wrap multi_act method
     original_multi_act = agent.multi_act
     agent.multi_act = wrap_multi_act(original_multi_act, plugin)
     
+    # Wrap run method
+    agent.run = wrap_run(agent.run, plugin)
+    
     # Add plugin to agent object
     agent.screenshot_plugin = plugin
     
@@ -1,17 +1,98 @@
+import asyncio
+import concurrent.futures
+import functools
+import hashlib
+import io
 import json
 import logging
 import os
-import base64
+import binascii
 import re
+import tarfile
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime
-from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
 
-from browser_use.agent.views import AgentOutput, ActionResult
+from browser_use.agent.views import AgentHistoryList, AgentOutput, ActionResult
 from browser_use.browser.views import BrowserState
 
 logger = logging.getLogger(__name__)
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Size of the base64 slices decoded at a time when writing screenshots.
+# Must be a multiple of 4 so each slice decodes independently.
+_B64_CHUNK_SIZE = 64 * 1024
+
+# Fenced ```json block inside extracted content
+_JSON_BLOCK_RE = re.compile(r'```json\s*(.*?)\s*```', re.DOTALL)
+
+# Number of recently saved screenshot digests kept for hard-linking unchanged frames
+_RECENT_SCREENSHOTS = 8
+
+
+def _dumps(data) -> bytes:
+    """Serialize data to indented UTF-8 JSON, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, indent=2, ensure_ascii=False).encode("utf-8")
+
+
+def _dumps_line(data) -> bytes:
+    """Serialize data to a single newline-terminated JSON line for JSONL files."""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE)
+    return json.dumps(data, ensure_ascii=False).encode("utf-8") + b"\n"
+
+
+# Flags for unbuffered file writes; O_BINARY only exists (and matters) on Windows
+_WRITE_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0)
+_APPEND_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_APPEND | getattr(os, "O_BINARY", 0)
+
+
+def _write_all(fd: int, data: bytes) -> None:
+    """Write all of data to a file descriptor, retrying on partial writes."""
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+
+def _write_chunks(path: str, chunks: Iterable[bytes]) -> None:
+    """Write byte chunks to a file with os.write, bypassing Python's buffered IO layer."""
+    fd = os.open(path, _WRITE_FLAGS, 0o644)
+    try:
+        for chunk in chunks:
+            _write_all(fd, chunk)
+    finally:
+        os.close(fd)
+
+
+def _png_chunks(state: BrowserState) -> Iterator[bytes]:
+    """Yield the PNG bytes of a state's screenshot, decoding base64 in slices when needed."""
+    if state.screenshot_raw:
+        yield state.screenshot_raw
+        return
+    
+    screenshot_b64 = state.screenshot
+    for start in range(0, len(screenshot_b64), _B64_CHUNK_SIZE):
+        yield binascii.a2b_base64(screenshot_b64[start:start + _B64_CHUNK_SIZE])
+
+
+def _to_webp(png_bytes: bytes) -> bytes:
+    """Transcode PNG bytes to WebP."""
+    from PIL import Image
+    
+    output = io.BytesIO()
+    with Image.open(io.BytesIO(png_bytes)) as image:
+        image.save(output, "WEBP", quality=85, method=4)
+    return output.getvalue()
+
+
 class ScreenshotPlugin:
     """
     Plugin for saving screenshots and plan information during agent execution.
@@ -20,7 +101,14 @@ class ScreenshotPlugin:
     in a structured directory.
     """
     
-    def __init__(self, base_dir: str = "screenshots", save_plans: bool = True, full_page: bool = True):
+    def __init__(
+        self,
+        base_dir: str = "screenshots",
+        save_plans: bool = True,
+        full_page: bool = True,
+        image_format: str = "png",
+        archive: bool = False,
+    ):
         """
         Initialize the screenshot plugin.
         
@@ -28,16 +116,65 @@ class ScreenshotPlugin:
             base_dir: Base directory for saving screenshots and plans
             save_plans: Whether to save plan information
             full_page: Whether to capture the full scrollable page
+            image_format: Screenshot file format, "png" or "webp" (requires Pillow)
+            archive: Whether to write the per-step files into a single session_<timestamp>.tar
+                in base_dir instead of one directory per step
         """
+        if image_format not in ("png", "webp"):
+            raise ValueError(f"Unsupported image format: {image_format}")
+        if image_format == "webp":
+            try:
+                from PIL import features
+            except ImportError:
+                logger.warning(
+                    "WebP screenshots were requested but Pillow is not installed, saving PNG instead. "
+                    "Install with 'pip install pillow' to use WebP."
+                )
+                image_format = "png"
+            else:
+                if not features.check("webp"):
+                    logger.warning("WebP screenshots were requested but Pillow was built without WebP support, saving PNG instead.")
+                    image_format = "png"
+        
         self.base_dir = base_dir
         self.save_plans = save_plans
         self.full_page = full_page
+        self.image_format = image_format
+        self.archive = archive
         self.current_step = 0
-        self.plans = []
         self.current_timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         
+        # Execution directories already created, by step number
+        self._execute_dirs: Dict[int, str] = {}
+        
+        # Plans are appended to a JSONL file as they arrive instead of being kept in memory.
+        # The file is opened on the first plan; writes can come from several IO threads.
+        self._plans_fd: Optional[int] = None
+        self._plans_lock = threading.Lock()
+        
+        # Paths of the most recently saved screenshots by PNG digest, so an unchanged
+        # frame is hard-linked to an earlier one instead of written again. Frames are
+        # compared across result indices: a step's initial and final screenshots are
+        # often identical, and screenshot_0 is written twice per step.
+        self._recent_screenshots: OrderedDict[str, str] = OrderedDict()
+        self._screenshot_lock = threading.Lock()
+        
+        # Session archive used when archiving, opened on the first write
+        self._tar: Optional[tarfile.TarFile] = None
+        self._tar_lock = threading.Lock()
+        
+        # Blocking disk writes are offloaded here so they don't stall the event loop
+        self._io_executor = concurrent.futures.ThreadPoolExecutor(max_workers=2, thread_name_prefix="screenshot-io")
+        
+        # Background writer for writes that don't need to finish before the agent
+        # moves on; started on first use since the plugin may be created outside a loop
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer_task: Optional[asyncio.Task] = None
+        # Last queued write submitted to the IO executor; the next one waits for it
+        self._pending_write: Optional[concurrent.futures.Future] = None
+        
         # Create base directory if not exists
-        Path(self.base_dir).mkdir(parents=True, exist_ok=True)
+        os.makedirs(self.base_dir, exist_ok=True)
         
     def save_screenshot(self, state: BrowserState, result_index: int = 0, step_number: Optional[int] = None) -> str:
         """
@@ -49,7 +186,8 @@ class ScreenshotPlugin:
             step_number: Custom step number, uses internal counter if None
             
         Returns:
-            Path to the saved screenshot
+            Path to the saved screenshot. In archive mode the file only exists inside
+            the session archive, as the member named by this path relative to base_dir.
         """
         if step_number is None:
             step_number = self.current_step
@@ -58,22 +196,9 @@ class ScreenshotPlugin:
         execute_dir = self._create_execute_dir(step_number)
         
         # Save screenshot with result index
-        screenshot_path = os.path.join(execute_dir, f"screenshot_{result_index}.png")
+        screenshot_path = os.path.join(execute_dir, f"screenshot_{result_index}.{self.image_format}")
         
-        if state.screenshot:
-            try:
-                # Convert base64 string back to binary data
-                screenshot_bytes = base64.b64decode(state.screenshot)
-                
-                with open(screenshot_path, "wb") as f:
-                    f.write(screenshot_bytes)
-                logger.info(f"Screenshot saved to {screenshot_path}")
-            except Exception as e:
-                logger.error(f"Error saving screenshot: {e}")
-        else:
-            logger.warning("No screenshot available in browser state")
-            
-        return screenshot_path
+        return self._write_screenshot(state, screenshot_path)
     
     def save_plan(self, model_output: AgentOutput, step_number: Optional[int] = None) -> str:
         """
@@ -84,7 +209,8 @@ class ScreenshotPlugin:
             step_number: Custom step number, uses internal counter if None
             
         Returns:
-            Path to the saved plan file
+            Path to the saved plan file, an archive member path in archive mode
+            (see save_screenshot)
         """
         if not self.save_plans:
             return ""
@@ -95,30 +221,15 @@ class ScreenshotPlugin:
         # Create directory for this execution step
         execute_dir = self._create_execute_dir(step_number)
         
-        # Extract plan information
-        plan_data = {
-            "step_number": step_number,
-            "timestamp": datetime.now().isoformat(),
-            "current_state": model_output.current_state.model_dump() if model_output.current_state else None,
-            "actions": [action.model_dump() for action in model_output.action]
-            #"next_goal": model_output.current_state.next_goal if model_output.current_state else None,
-            #"evaluation": model_output.current_state.evaluation_previous_goal if model_output.current_state else None,
-        }
-        
-        # Save plan to the plans list
-        self.plans.append(plan_data)
-        
-        # Save plan file
-        plan_path = os.path.join(execute_dir, "plan.json")
-        with open(plan_path, "w") as f:
-            json.dump(plan_data, f, indent=2)
-        
-        logger.info(f"Plan saved to {plan_path}")
-        return plan_path
+        return self._write_plan(model_output, step_number, execute_dir)
     
     @staticmethod
     def JSON_to_dict(text):
-        json_match = re.search(r'```json\s*(.*?)\s*```', text, re.DOTALL)
+        # Most results contain no fenced JSON block, skip the regex for those
+        if '```json' not in text:
+            return text
+        
+        json_match = _JSON_BLOCK_RE.search(text)
         if json_match:
             json_str = json_match.group(1)
             try:
@@ -141,7 +252,8 @@ class ScreenshotPlugin:
             step_number: Custom step number, uses internal counter if None
             
         Returns:
-            Path to the saved results file
+            Path to the saved results file, an archive member path in archive mode
+            (see save_screenshot)
         """
         if step_number is None:
             step_number = self.current_step
@@ -163,13 +275,165 @@ class ScreenshotPlugin:
         
         # Save results file
         results_path = os.path.join(execute_dir, "results.json")
-        with open(results_path, "w", encoding='utf-8') as f:
-            json_str = json.dumps(results_data, indent=2, ensure_ascii=False)
-            f.write(json_str)
+        self._write_file(results_path, (_dumps(results_data),))
         
         logger.info(f"Results saved to {results_path}")
         return results_path
     
+    async def asave_screenshot(self, state: BrowserState, result_index: int = 0, step_number: Optional[int] = None) -> str:
+        """Async variant of save_screenshot that writes the file on the IO executor."""
+        if step_number is None:
+            step_number = self.current_step
+        return await self._run_io(self.save_screenshot, state, result_index, step_number)
+    
+    async def asave_plan(self, model_output: AgentOutput, step_number: Optional[int] = None) -> str:
+        """Async variant of save_plan that writes the file on the IO executor."""
+        if step_number is None:
+            step_number = self.current_step
+        return await self._run_io(self.save_plan, model_output, step_number)
+    
+    async def asave_results(self, results: List[ActionResult], step_number: Optional[int] = None) -> str:
+        """Async variant of save_results that writes the file on the IO executor."""
+        if step_number is None:
+            step_number = self.current_step
+        return await self._run_io(self.save_results, results, step_number)
+    
+    async def aclose(self) -> None:
+        """Flush queued writes, then release the IO threads, the all-plans file and the session archive."""
+        await self.flush()
+        await self._run_io(self.handle_done)
+        self._io_executor.shutdown(wait=False)
+    
+    def close(self) -> None:
+        """
+        Release the IO threads, the all-plans file and the session archive.
+        
+        Writes still in the background queue are run synchronously first, which blocks
+        the event loop; prefer aclose() when closing from inside it.
+        """
+        self._io_executor.shutdown(wait=True)
+        
+        if self._queue is not None:
+            while not self._queue.empty():
+                job = self._queue.get_nowait()
+                try:
+                    if job is not None:
+                        job()
+                except Exception as e:
+                    logger.error(f"Error in background write: {e}")
+                finally:
+                    self._queue.task_done()
+            if not self._writer_task.done():
+                try:
+                    self._writer_task.cancel()
+                except RuntimeError:
+                    # The writer's event loop is already closed
+                    pass
+            self._queue = None
+            self._writer_task = None
+        
+        self.handle_done()
+    
+    def __del__(self):
+        # Plugins that were never closed should not keep their IO threads or files around
+        executor = getattr(self, "_io_executor", None)
+        if executor is not None:
+            executor.shutdown(wait=False)
+        if getattr(self, "_plans_fd", None) is not None:
+            os.close(self._plans_fd)
+            self._plans_fd = None
+        if getattr(self, "_tar", None) is not None:
+            self._tar.close()
+            self._tar = None
+    
+    async def _run_io(self, func, *args):
+        """Run a blocking function on the IO executor and await its result."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._io_executor, func, *args)
+    
+    def queue_write(self, func: Callable, *args) -> None:
+        """
+        Schedule a blocking write to run on the IO executor without waiting for it.
+        
+        Writes run one at a time in the order they were queued. Without a running
+        event loop the write runs immediately instead.
+        
+        Args:
+            func: Blocking function performing the write, e.g. save_screenshot
+            *args: Arguments for func
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            func(*args)
+            return
+        
+        if self._writer_task is None or self._writer_task.get_loop() is not loop:
+            self._queue = asyncio.Queue()
+            self._writer_task = None
+        if self._writer_task is None or self._writer_task.done():
+            # A cancelled writer leaves its unfinished writes in the queue for the new one
+            self._writer_task = loop.create_task(self._drain(self._queue))
+        self._queue.put_nowait(functools.partial(func, *args))
+    
+    async def flush(self) -> None:
+        """
+        Wait until all queued writes are done and stop the background writer.
+        
+        When the writer was cancelled (e.g. the run was interrupted), the writes it left
+        in the queue are run here. If flush itself is cancelled, the queue is kept so
+        close() can still run them.
+        """
+        if self._writer_task is None:
+            return
+        
+        queue = self._queue
+        if not self._writer_task.done():
+            # Stop the writer once it reaches the end of the queue
+            queue.put_nowait(None)
+            await asyncio.wait([self._writer_task])
+        
+        while not queue.empty():
+            job = queue.get_nowait()
+            try:
+                if job is not None:
+                    await self._run_queued(job)
+            finally:
+                queue.task_done()
+        self._queue = None
+        self._writer_task = None
+    
+    async def _drain(self, queue: asyncio.Queue) -> None:
+        """Run queued writes on the IO executor until cancelled or stopped by flush."""
+        while True:
+            job = await queue.get()
+            try:
+                if job is None:
+                    return
+                await self._run_queued(job)
+            finally:
+                queue.task_done()
+    
+    async def _run_queued(self, job: Callable) -> None:
+        """
+        Run one queued write on the IO executor once the previous queued write has finished.
+        
+        The write is submitted before anything is awaited and then shielded, so cancelling
+        the caller doesn't drop a write that was already taken off the queue.
+        """
+        previous = self._pending_write
+        
+        def run():
+            if previous is not None:
+                concurrent.futures.wait([previous])
+            job()
+        
+        try:
+            self._pending_write = self._io_executor.submit(run)
+            await asyncio.shield(asyncio.wrap_future(self._pending_write))
+        except Exception as e:
+            logger.error(f"Error in background write: {e}")
+    
     def handle_step(self, state: BrowserState, model_output: AgentOutput, step_number: int) -> None:
         """
         Handle a new agent step by saving screenshot and plan.
@@ -179,36 +443,232 @@ class ScreenshotPlugin:
             model_output: Agent output
             step_number: Step number (already incremented by Agent)
         """
-        # Since step_number is already incremented in Agent.step(),
-        # we need to subtract 1 to get the correct step number for saving
-        actual_step = step_number - 1
-        self.current_step = actual_step
+        actual_step = self._begin_step(step_number)
         
-        # Save initial screenshot for the step
-        self.save_screenshot(state, 0, actual_step)
-        self.save_plan(model_output, actual_step)
+        # Save initial screenshot and plan for the step
+        self._write_step_bundle(state, model_output, actual_step)
     
-    def handle_done(self, history: List[Dict]) -> None:
+    def handle_done(self, history: Any = None) -> None:
         """
         Handle agent completion by saving all plans.
         
         Args:
-            history: Agent history
+            history: Agent history, unused; kept for backward compatibility
         """
         self.save_all_plans()
+        self._close_archive()
+    
+    async def astep(self, state: BrowserState, model_output: AgentOutput, step_number: int) -> None:
+        """Step callback for the agent: handle_step with the disk writes queued in the background."""
+        actual_step = self._begin_step(step_number)
+        self.queue_write(self._write_step_bundle, state, model_output, actual_step)
+    
+    async def adone(self, history: AgentHistoryList) -> None:
+        """Done callback for the agent: waits for queued writes, then runs handle_done on the IO executor."""
+        await self.flush()
+        await self._run_io(self.handle_done)
+    
+    def _begin_step(self, step_number: int) -> int:
+        """Make a new agent step current and return the step number used for saving."""
+        # Since step_number is already incremented in Agent.step(),
+        # we need to subtract 1 to get the correct step number for saving
+        actual_step = step_number - 1
+        self.current_step = actual_step
+        return actual_step
     
     def save_all_plans(self) -> None:
-        """Save all collected plans to a single file"""
-        if not self.save_plans or not self.plans:
-            return
+        """
+        Finish the session's all-plans file.
+        
+        Plans are appended to all_plans_<timestamp>.jsonl as they are saved, so this
+        only closes the file. A later plan reopens it in append mode.
+        """
+        with self._plans_lock:
+            if self._plans_fd is None:
+                return
+            os.close(self._plans_fd)
+            self._plans_fd = None
             
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        all_plans_path = os.path.join(self.base_dir, f"all_plans_{timestamp}.json")
+        logger.info(f"All plans saved to {self._all_plans_path()}")
+    
+    def _all_plans_path(self) -> str:
+        """Path of the JSONL file collecting all plans of this session."""
+        return os.path.join(self.base_dir, f"all_plans_{self.current_timestamp}.jsonl")
+    
+    def _append_plan(self, plan_data: Dict) -> None:
+        """Append one plan as a line to the all-plans file, opening it if needed."""
+        line = _dumps_line(plan_data)
+        with self._plans_lock:
+            if self._plans_fd is None:
+                self._plans_fd = os.open(self._all_plans_path(), _APPEND_FLAGS, 0o644)
+            _write_all(self._plans_fd, line)
+    
+    def _write_screenshot(self, state: BrowserState, screenshot_path: str) -> str:
+        """
+        Write the screenshot carried by a browser state to the given path.
         
-        with open(all_plans_path, "w") as f:
-            json.dump(self.plans, f, indent=2)
+        A frame identical to one of the last few saved is hard-linked to it instead of
+        written again. Hard links (rather than symlinks) keep every copy valid, since a
+        path is unlinked before it is rewritten.
+        
+        Returns:
+            Path the screenshot was saved to, which ends in .png instead of .webp when
+            the WebP transcode failed
+        """
+        if not state.screenshot_raw and not state.screenshot:
+            logger.warning("No screenshot available in browser state")
+            return screenshot_path
+        
+        try:
+            # Hash base64 screenshots slice by slice, so an unchanged frame is linked
+            # without ever holding the whole decoded PNG in memory
+            digest = hashlib.blake2b(digest_size=16)
+            for chunk in _png_chunks(state):
+                digest.update(chunk)
+            digest = digest.hexdigest()
             
-        logger.info(f"All plans saved to {all_plans_path}")
+            with self._screenshot_lock:
+                last_path = self._recent_screenshots.get(digest)
+            if last_path is not None:
+                # Keep the extension of the previous file, it may be a PNG fallback
+                screenshot_path = os.path.splitext(screenshot_path)[0] + os.path.splitext(last_path)[1]
+                if last_path == screenshot_path:
+                    return screenshot_path
+                try:
+                    self._unlink_screenshot(screenshot_path)
+                    self._link_file(last_path, screenshot_path)
+                except OSError as e:
+                    logger.debug(f"Could not link {screenshot_path} to {last_path}, writing it instead: {e}")
+                else:
+                    self._remember_screenshot(digest, screenshot_path)
+                    logger.info(f"Screenshot unchanged, {screenshot_path} linked to {last_path}")
+                    return screenshot_path
+            
+            # A changed PNG is decoded again in slices straight into the file
+            chunks = _png_chunks(state)
+            if self.image_format == "webp":
+                # WebP needs the whole PNG in memory for transcoding
+                png_bytes = b"".join(chunks)
+                try:
+                    chunks = (_to_webp(png_bytes),)
+                except Exception as e:
+                    # e.g. full-page captures taller than libwebp's 16383 px limit
+                    screenshot_path = os.path.splitext(screenshot_path)[0] + ".png"
+                    logger.warning(f"WebP encoding failed ({e}), saving PNG to {screenshot_path} instead")
+                    chunks = (png_bytes,)
+            
+            self._unlink_screenshot(screenshot_path)
+            self._write_file(screenshot_path, chunks)
+            self._remember_screenshot(digest, screenshot_path)
+            logger.info(f"Screenshot saved to {screenshot_path}")
+        except Exception as e:
+            logger.error(f"Error saving screenshot: {e}")
+        return screenshot_path
+    
+    def _remember_screenshot(self, digest: str, screenshot_path: str) -> None:
+        """Record the frame now saved at a path, forgetting whatever was there before."""
+        with self._screenshot_lock:
+            for old_digest, old_path in list(self._recent_screenshots.items()):
+                if old_path == screenshot_path:
+                    del self._recent_screenshots[old_digest]
+            self._recent_screenshots[digest] = screenshot_path
+            self._recent_screenshots.move_to_end(digest)
+            while len(self._recent_screenshots) > _RECENT_SCREENSHOTS:
+                self._recent_screenshots.popitem(last=False)
+    
+    def _unlink_screenshot(self, screenshot_path: str) -> None:
+        """Remove an existing screenshot so rewriting it can't truncate a file other paths link to."""
+        if self.archive:
+            return
+        try:
+            os.remove(screenshot_path)
+        except FileNotFoundError:
+            pass
+    
+    def _write_file(self, path: str, chunks: Iterable[bytes]) -> None:
+        """
+        Write byte chunks to a per-step file, or to the session archive when archiving.
+        
+        In archive mode the path relative to base_dir becomes the member name. A member
+        written again is appended, and the later copy wins on extraction.
+        """
+        if not self.archive:
+            _write_chunks(path, chunks)
+            return
+        
+        data = b"".join(chunks)
+        info = self._archive_member(path)
+        info.size = len(data)
+        with self._tar_lock:
+            self._open_archive().addfile(info, io.BytesIO(data))
+    
+    def _link_file(self, existing_path: str, path: str) -> None:
+        """Hard-link an already written per-step file to a new path, in the archive when archiving."""
+        if not self.archive:
+            os.link(existing_path, path)
+            return
+        
+        info = self._archive_member(path)
+        info.type = tarfile.LNKTYPE
+        info.linkname = self._archive_member(existing_path).name
+        with self._tar_lock:
+            self._open_archive().addfile(info)
+    
+    def _archive_member(self, path: str) -> tarfile.TarInfo:
+        """Create the archive member header for a path under base_dir."""
+        info = tarfile.TarInfo(os.path.relpath(path, self.base_dir).replace(os.sep, "/"))
+        info.mtime = int(time.time())
+        return info
+    
+    def _open_archive(self) -> tarfile.TarFile:
+        """Return the session archive, opening it for appending if needed. Caller holds _tar_lock."""
+        if self._tar is None:
+            self._tar = tarfile.open(os.path.join(self.base_dir, f"session_{self.current_timestamp}.tar"), "a")
+        return self._tar
+    
+    def _close_archive(self) -> None:
+        """Close the session archive; a later write reopens it in append mode."""
+        with self._tar_lock:
+            if self._tar is None:
+                return
+            self._tar.close()
+            self._tar = None
+    
+    def _write_plan(self, model_output: AgentOutput, step_number: int, execute_dir: str) -> str:
+        """Build the plan data for a step and write it to plan.json in the execution directory."""
+        # Extract plan information
+        plan_data = {
+            "step_number": step_number,
+            "timestamp": datetime.now().isoformat(),
+            "current_state": model_output.current_state.model_dump() if model_output.current_state else None,
+            "actions": [action.model_dump() for action in model_output.action]
+            #"next_goal": model_output.current_state.next_goal if model_output.current_state else None,
+            #"evaluation": model_output.current_state.evaluation_previous_goal if model_output.current_state else None,
+        }
+        
+        # Append plan to the session's plans file
+        self._append_plan(plan_data)
+        
+        # Save plan file
+        plan_path = os.path.join(execute_dir, "plan.json")
+        self._write_file(plan_path, (_dumps(plan_data),))
+        
+        logger.info(f"Plan saved to {plan_path}")
+        return plan_path
+    
+    def _write_step_bundle(self, state: BrowserState, model_output: AgentOutput, step_number: int) -> None:
+        """
+        Write the initial screenshot and the plan of a step, creating its directory once.
+        
+        Args:
+            state: Browser state
+            model_output: Agent output
+            step_number: Step number
+        """
+        execute_dir = self._create_execute_dir(step_number)
+        self._write_screenshot(state, os.path.join(execute_dir, f"screenshot_0.{self.image_format}"))
+        if self.save_plans:
+            self._write_plan(model_output, step_number, execute_dir)
     
     def _create_execute_dir(self, step_number: int) -> str:
         """
@@ -220,8 +680,13 @@ class ScreenshotPlugin:
         Returns:
             Path to the execution directory
         """
+        if step_number in self._execute_dirs:
+            return self._execute_dirs[step_number]
+        
         dir_path = os.path.join(self.base_dir, f"execute_{step_number:03d}_{self.current_timestamp}")
-        Path(dir_path).mkdir(parents=True, exist_ok=True)
+        if not self.archive:
+            os.makedirs(dir_path, exist_ok=True)
+        self._execute_dirs[step_number] = dir_path
         return dir_path 
 
     async def take_screenshot(self, browser_context) -> str:
@@ -1,5 +1,5 @@
 import base64
-from unittest.mock import Mock
+from unittest.mock import AsyncMock, Mock
 
 import pytest
 
@@ -296,6 +296,34 @@ async def test_take_screenshot():
 	assert result == expected, f'Expected {expected}, but got {result}'
 
 
+@pytest.mark.asyncio
+async def test_take_screenshot_raw():
+	"""
+	Test the take_screenshot_raw method to verify that it returns the PNG bytes from the page
+	unchanged, without the base64 encoding done by take_screenshot.
+	"""
+
+	class DummyPage:
+		async def bring_to_front(self):
+			pass
+
+		async def wait_for_load_state(self):
+			pass
+
+		async def screenshot(self, full_page, animations):
+			assert full_page is True, 'full_page parameter was not correctly passed'
+			assert animations == 'disabled', 'animations parameter was not correctly passed'
+			return b'test'
+
+	dummy_browser = Mock()
+	dummy_browser.config = Mock()
+	context = BrowserContext(browser=dummy_browser, config=BrowserContextConfig())
+	context.get_current_page = AsyncMock(return_value=DummyPage())
+
+	assert await context.take_screenshot_raw(full_page=True) == b'test'
+	assert await context.take_screenshot(full_page=True) == base64.b64encode(b'test').decode('utf-8')
+
+
 @pytest.mark.asyncio
 async def test_refresh_page_behavior():
 	"""
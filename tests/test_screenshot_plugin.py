@@ -0,0 +1,352 @@
+import asyncio
+import base64
+import io
+import json
+import os
+import tarfile
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from browser_use.agent.views import ActionResult, AgentBrain, AgentOutput
+from browser_use.browser.context import BrowserContext, BrowserContextConfig
+from browser_use.browser.views import BrowserState
+from browser_use.controller.registry.views import ActionModel
+from browser_use.dom.views import DOMElementNode
+from browser_use.plugins.screenshot import service
+from browser_use.plugins.screenshot.integration import wrap_multi_act, wrap_run
+from browser_use.plugins.screenshot.service import ScreenshotPlugin
+
+
+def make_state(screenshot_raw: bytes | None = None, screenshot: str | None = None) -> BrowserState:
+	"""Create a minimal browser state carrying the given screenshot."""
+	return BrowserState(
+		element_tree=DOMElementNode(
+			tag_name='div',
+			attributes={},
+			children=[],
+			is_visible=True,
+			parent=None,
+			xpath='//div',
+		),
+		selector_map={},
+		url='https://example.com',
+		title='Example',
+		tabs=[],
+		screenshot=screenshot,
+		screenshot_raw=screenshot_raw,
+	)
+
+
+@pytest.fixture
+def plugin(tmp_path):
+	plugin = ScreenshotPlugin(base_dir=str(tmp_path))
+	yield plugin
+	plugin.close()
+
+
+def test_unchanged_screenshot_is_hard_linked(plugin):
+	"""
+	A frame identical to a recently saved one is hard-linked, and base64 and raw
+	screenshots of the same PNG are recognised as identical.
+	"""
+	png = b'\x89PNG frame one'
+	first = plugin.save_screenshot(make_state(screenshot=base64.b64encode(png).decode()), 1, 1)
+	second = plugin.save_screenshot(make_state(screenshot_raw=png), 1, 2)
+
+	assert first != second
+	assert os.path.samefile(first, second)
+	with open(second, 'rb') as f:
+		assert f.read() == png
+
+
+def test_base64_screenshot_decoded_in_slices(plugin):
+	"""Base64 screenshots larger than one decode slice are written back byte for byte."""
+	png = b'\x89PNG' + os.urandom(200 * 1024)
+	path = plugin.save_screenshot(make_state(screenshot=base64.b64encode(png).decode()), 0, 1)
+	linked = plugin.save_screenshot(make_state(screenshot_raw=png), 0, 2)
+
+	with open(path, 'rb') as f:
+		assert f.read() == png
+	assert os.path.samefile(path, linked)
+
+
+def test_rewriting_linked_screenshot_keeps_other_copies(plugin):
+	"""Rewriting a path that is hard-linked must not change the content of the other links."""
+	png = b'\x89PNG frame one'
+	first = plugin.save_screenshot(make_state(screenshot_raw=png), 0, 1)
+	second = plugin.save_screenshot(make_state(screenshot_raw=png), 0, 2)
+	assert os.path.samefile(first, second)
+
+	rewritten = plugin.save_screenshot(make_state(screenshot_raw=b'\x89PNG frame two'), 0, 2)
+
+	assert rewritten == second
+	assert not os.path.samefile(first, second)
+	with open(first, 'rb') as f:
+		assert f.read() == png
+	with open(second, 'rb') as f:
+		assert f.read() == b'\x89PNG frame two'
+
+
+def test_unchanged_step_links_initial_and_final_screenshots(plugin):
+	"""
+	An action that leaves the page unchanged gets its final screenshot linked to the
+	initial one, even though screenshot_0 is first written with the highlighted frame.
+	"""
+	page = b'\x89PNG page'
+	highlighted = b'\x89PNG page with highlights'
+	for step in (1, 2):
+		plugin.save_screenshot(make_state(screenshot=base64.b64encode(highlighted).decode()), 0, step)
+		initial = plugin.save_screenshot(make_state(screenshot_raw=page), 0, step)
+		final = plugin.save_screenshot(make_state(screenshot_raw=page), 2, step)
+
+		assert os.path.samefile(initial, final)
+		with open(initial, 'rb') as f:
+			assert f.read() == page
+
+	assert os.stat(final).st_nlink == 4
+
+
+def test_changed_screenshot_is_written(plugin):
+	"""Different frames for the same result index are written as separate files."""
+	first = plugin.save_screenshot(make_state(screenshot_raw=b'\x89PNG frame one'), 0, 1)
+	second = plugin.save_screenshot(make_state(screenshot_raw=b'\x89PNG frame two'), 0, 2)
+
+	assert not os.path.samefile(first, second)
+	with open(second, 'rb') as f:
+		assert f.read() == b'\x89PNG frame two'
+
+
+def make_png(color: str) -> bytes:
+	"""Encode a small solid-colour PNG with Pillow."""
+	from PIL import Image
+
+	output = io.BytesIO()
+	Image.new('RGB', (32, 16), color).save(output, 'PNG')
+	return output.getvalue()
+
+
+def test_webp_screenshot_is_transcoded(tmp_path):
+	"""With image_format='webp' screenshots are saved as WebP files."""
+	pytest.importorskip('PIL')
+	plugin = ScreenshotPlugin(base_dir=str(tmp_path), image_format='webp')
+	path = plugin.save_screenshot(make_state(screenshot_raw=make_png('red')), 0, 1)
+	plugin.close()
+
+	assert path.endswith('screenshot_0.webp')
+	with open(path, 'rb') as f:
+		header = f.read(12)
+	assert header[:4] == b'RIFF' and header[8:] == b'WEBP'
+
+
+def test_webp_encode_failure_falls_back_to_png(tmp_path, monkeypatch):
+	"""A frame WebP can't encode (e.g. taller than 16383 px) is saved as PNG, and that path is returned."""
+	pytest.importorskip('PIL')
+
+	def fail(png_bytes):
+		raise OSError('encoder error -2')
+
+	monkeypatch.setattr(service, '_to_webp', fail)
+	plugin = ScreenshotPlugin(base_dir=str(tmp_path), image_format='webp')
+	png = make_png('blue')
+	path = plugin.save_screenshot(make_state(screenshot_raw=png), 0, 1)
+	plugin.close()
+
+	assert path.endswith('screenshot_0.png')
+	assert not os.path.exists(path[: -len('.png')] + '.webp')
+	with open(path, 'rb') as f:
+		assert f.read() == png
+
+
+async def test_queued_writes_run_in_order_and_flush(plugin):
+	"""Queued writes run one at a time in queue order, and flush waits for all of them."""
+	order = []
+	for i in range(5):
+		plugin.queue_write(order.append, i)
+	path = plugin.save_screenshot(make_state(screenshot_raw=b'\x89PNG'), 0, 1)
+	plugin.queue_write(plugin.save_screenshot, make_state(screenshot_raw=b'\x89PNG first'), 0, 1)
+	plugin.queue_write(plugin.save_screenshot, make_state(screenshot_raw=b'\x89PNG last'), 0, 1)
+
+	await plugin.flush()
+
+	assert order == [0, 1, 2, 3, 4]
+	with open(path, 'rb') as f:
+		assert f.read() == b'\x89PNG last'
+	assert plugin._writer_task is None
+
+
+async def test_run_flushes_queued_writes_without_done_callback(plugin):
+	"""Writes queued during a run that ends without the done callback (e.g. an error) still reach disk."""
+
+	async def run():
+		for step in range(3):
+			plugin.queue_write(plugin.save_screenshot, make_state(screenshot_raw=f'\x89PNG {step}'.encode()), 0, step)
+			plugin.queue_write(plugin.save_results, [], step)
+		raise RuntimeError('max failures reached')
+
+	with pytest.raises(RuntimeError):
+		await wrap_run(run, plugin)()
+
+	for step in range(3):
+		execute_dir = plugin._create_execute_dir(step)
+		with open(os.path.join(execute_dir, 'screenshot_0.png'), 'rb') as f:
+			assert f.read() == f'\x89PNG {step}'.encode()
+		assert os.path.exists(os.path.join(execute_dir, 'results.json'))
+
+
+async def test_cancelled_run_keeps_queued_writes(plugin):
+	"""Writes queued before a run is cancelled (e.g. Ctrl+C) still reach disk, even when the writer is cancelled too."""
+	queued = asyncio.Event()
+
+	async def run():
+		for step in range(5):
+			plugin.queue_write(plugin.save_results, [], step)
+		queued.set()
+		await asyncio.sleep(60)
+
+	task = asyncio.create_task(wrap_run(run, plugin)())
+	await queued.wait()
+	# asyncio.run() teardown cancels every task, the background writer included
+	plugin._writer_task.cancel()
+	task.cancel()
+	with pytest.raises(asyncio.CancelledError):
+		await task
+	plugin.close()
+
+	for step in range(5):
+		assert os.path.exists(os.path.join(plugin._create_execute_dir(step), 'results.json'))
+
+
+async def test_wrapped_multi_act_saves_step_files(plugin):
+	"""
+	A step run through astep, the wrapped multi_act and adone saves the initial raw frame
+	over the highlighted one, a single final frame named after the number of results,
+	the results and the plan, without touching the browser context's cached state.
+	"""
+	highlighted = b'\x89PNG highlighted'
+	initial = b'\x89PNG before actions'
+	final = b'\x89PNG after actions'
+	results = [ActionResult(extracted_content='first'), ActionResult(extracted_content='second', is_done=True)]
+
+	# BrowserContext returning the same cached state object every time, like get_state does
+	cached_state = make_state()
+	context = BrowserContext(browser=Mock(), config=BrowserContextConfig())
+	context.get_state = AsyncMock(return_value=cached_state)
+	context.take_screenshot_raw = AsyncMock(side_effect=[initial, final])
+
+	class DummyAgent:
+		browser_context = context
+
+		async def multi_act(self, actions, check_for_new_elements=True):
+			return results
+
+	agent = DummyAgent()
+	multi_act = wrap_multi_act(agent.multi_act, plugin)
+	model_output = AgentOutput(
+		current_state=AgentBrain(evaluation_previous_goal='', memory='', next_goal='Open the page'),
+		action=[ActionModel()],
+	)
+
+	# The agent has already incremented the step number when it calls the step callback
+	await plugin.astep(make_state(screenshot=base64.b64encode(highlighted).decode()), model_output, 2)
+	assert await multi_act([ActionModel()]) is results
+	await plugin.adone(Mock())
+
+	assert cached_state.screenshot_raw is None
+	context.take_screenshot_raw.assert_awaited_with(full_page=plugin.full_page)
+
+	execute_dir = plugin._create_execute_dir(1)
+	assert sorted(os.listdir(execute_dir)) == ['plan.json', 'results.json', 'screenshot_0.png', 'screenshot_2.png']
+	with open(os.path.join(execute_dir, 'screenshot_0.png'), 'rb') as f:
+		assert f.read() == initial
+	with open(os.path.join(execute_dir, 'screenshot_2.png'), 'rb') as f:
+		assert f.read() == final
+	with open(os.path.join(execute_dir, 'results.json'), encoding='utf-8') as f:
+		assert [r['extracted_content'] for r in json.load(f)] == ['first', 'second']
+	with open(os.path.join(execute_dir, 'plan.json'), encoding='utf-8') as f:
+		assert json.load(f)['step_number'] == 1
+
+
+def test_json_to_dict():
+	"""Fenced JSON blocks are parsed, anything else is returned unchanged."""
+	assert ScreenshotPlugin.JSON_to_dict('Clicked button 5') == 'Clicked button 5'
+	assert ScreenshotPlugin.JSON_to_dict('```json\n{"price": 10}\n```') == {'price': 10}
+	assert ScreenshotPlugin.JSON_to_dict('```json\n{not json}\n```') == '```json\n{not json}\n```'
+	assert ScreenshotPlugin.JSON_to_dict('```json without a closing fence') == '```json without a closing fence'
+
+
+async def test_close_runs_queued_writes(tmp_path):
+	"""close() runs writes still queued in the background instead of dropping them."""
+	plugin = ScreenshotPlugin(base_dir=str(tmp_path))
+	for step in range(3):
+		plugin.queue_write(plugin.save_results, [], step)
+
+	plugin.close()
+
+	for step in range(3):
+		assert os.path.exists(os.path.join(plugin._create_execute_dir(step), 'results.json'))
+
+
+async def test_aclose_flushes_and_closes_plans_file(tmp_path):
+	"""aclose() flushes queued writes and closes the all-plans file."""
+	plugin = ScreenshotPlugin(base_dir=str(tmp_path))
+	plugin.queue_write(plugin._append_plan, {'step_number': 0})
+	plugin.queue_write(plugin._append_plan, {'step_number': 1})
+
+	await plugin.aclose()
+
+	assert plugin._plans_fd is None
+	with open(plugin._all_plans_path(), encoding='utf-8') as f:
+		assert [json.loads(line)['step_number'] for line in f] == [0, 1]
+
+
+def test_archive_mode_writes_readable_tar(tmp_path):
+	"""In archive mode per-step files go into one tar, with unchanged frames stored as link members."""
+	plugin = ScreenshotPlugin(base_dir=str(tmp_path), archive=True)
+	png = b'\x89PNG frame one'
+	screenshot_path = plugin.save_screenshot(make_state(screenshot_raw=png), 0, 1)
+	plugin.save_results([], 1)
+	plugin.save_screenshot(make_state(screenshot_raw=png), 0, 2)
+	plugin.close()
+
+	# Returned paths name archive members rather than files on disk
+	assert not os.path.exists(screenshot_path)
+	member_name = os.path.relpath(screenshot_path, tmp_path).replace(os.sep, '/')
+
+	# No per-step directories, just the archive
+	assert [name for name in os.listdir(tmp_path) if name.startswith('execute_')] == []
+
+	step_1 = os.path.basename(plugin._create_execute_dir(1))
+	step_2 = os.path.basename(plugin._create_execute_dir(2))
+	with tarfile.open(tmp_path / f'session_{plugin.current_timestamp}.tar') as tar:
+		members = {member.name: member for member in tar.getmembers()}
+		assert set(members) == {
+			f'{step_1}/screenshot_0.png',
+			f'{step_1}/results.json',
+			f'{step_2}/screenshot_0.png',
+		}
+		assert member_name == f'{step_1}/screenshot_0.png'
+
+		link = members[f'{step_2}/screenshot_0.png']
+		assert link.islnk()
+		assert link.linkname == f'{step_1}/screenshot_0.png'
+
+		assert tar.extractfile(f'{step_1}/screenshot_0.png').read() == png
+		assert tar.extractfile(link).read() == png
+		assert json.loads(tar.extractfile(f'{step_1}/results.json').read()) == []
+
+		tar.extractall(tmp_path / 'extracted')
+	with open(tmp_path / 'extracted' / step_2 / 'screenshot_0.png', 'rb') as f:
+		assert f.read() == png
+
+
+def test_archive_reopens_in_append_mode(tmp_path):
+	"""Writes after the archive was closed are appended instead of replacing it."""
+	plugin = ScreenshotPlugin(base_dir=str(tmp_path), archive=True)
+	plugin.save_results([], 1)
+	plugin.handle_done()
+	plugin.save_results([], 2)
+	plugin.close()
+
+	with tarfile.open(tmp_path / f'session_{plugin.current_timestamp}.tar') as tar:
+		assert len(tar.getnames()) == 2